@@ -8,9 +8,36 @@ def try_parse(type, value: str):
         return None
 
 
+# Unlike `try_parse(...) or default`, keeps an explicit 0
+def try_parse_or(type, value: str, default):
+    parsed = try_parse(type, value)
+    return default if parsed is None else parsed
+
+
 # Configuration for POSTGRES
 POSTGRES_HOST = os.environ.get("POSTGRES_HOST") or "localhost"
 POSTGRES_PORT = try_parse(int, os.environ.get("POSTGRES_PORT")) or 5432
 POSTGRES_USER = os.environ.get("POSTGRES_USER") or "user"
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASS") or "pass"
 POSTGRES_DB = os.environ.get("POSTGRES_DB") or "test_db"
+
+# Configuration for the SQLAlchemy connection pool
+POSTGRES_POOL_SIZE = try_parse_or(int, os.environ.get("POSTGRES_POOL_SIZE"), 20)
+POSTGRES_MAX_OVERFLOW = try_parse_or(int, os.environ.get("POSTGRES_MAX_OVERFLOW"), 10)
+POSTGRES_POOL_TIMEOUT = try_parse_or(int, os.environ.get("POSTGRES_POOL_TIMEOUT"), 30)
+POSTGRES_POOL_RECYCLE = try_parse_or(int, os.environ.get("POSTGRES_POOL_RECYCLE"), 1800)
+# Set when connecting through pgbouncer in transaction mode: pooling is left to pgbouncer
+POSTGRES_PGBOUNCER = (os.environ.get("POSTGRES_PGBOUNCER") or "").lower() in ("1", "true", "yes")
+
+# Configuration for the background batch writer
+WRITE_FLUSH_INTERVAL_MS = try_parse(int, os.environ.get("WRITE_FLUSH_INTERVAL_MS")) or 100
+WRITE_MAX_ROWS = try_parse(int, os.environ.get("WRITE_MAX_ROWS")) or 1000
+WRITE_QUEUE_SIZE = try_parse(int, os.environ.get("WRITE_QUEUE_SIZE")) or 10000
+# Backoff between inserts while the database is unavailable, doubling up to the max
+WRITE_RETRY_DELAY_MS = try_parse_or(int, os.environ.get("WRITE_RETRY_DELAY_MS"), 500)
+WRITE_RETRY_MAX_DELAY_MS = try_parse_or(int, os.environ.get("WRITE_RETRY_MAX_DELAY_MS"), 10000)
+# How long shutdown waits for queued rows to be written
+WRITE_SHUTDOWN_TIMEOUT_MS = try_parse_or(int, os.environ.get("WRITE_SHUTDOWN_TIMEOUT_MS"), 30000)
+
+# Interval between websocket broadcasts of the latest sample per user
+BROADCAST_INTERVAL_MS = try_parse(int, os.environ.get("BROADCAST_INTERVAL_MS")) or 100
@@ -7,5 +7,7 @@ CREATE TABLE processed_agent_data (
     z FLOAT,
     latitude FLOAT,
     longitude FLOAT,
-    timestamp TIMESTAMP
-);
\ No newline at end of file
+    timestamp TIMESTAMP -- UTC, stored without offset
+);
+
+CREATE INDEX IF NOT EXISTS ix_processed_agent_data_user_id_timestamp ON processed_agent_data (user_id, timestamp);
\ No newline at end of file
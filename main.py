@@ -1,17 +1,46 @@
-from typing import List, Set
-from sqlalchemy import Table, Column, Integer, String, Float, DateTime, create_engine, MetaData, select
+from typing import List, Set, Dict, Optional
+from collections import defaultdict
+from sqlalchemy import Table, Column, Index, Integer, String, Float, DateTime, MetaData, select, bindparam
 from config import *
 
-from sqlalchemy.orm import sessionmaker, Session
-from fastapi import FastAPI, HTTPException, Depends
-import json
-from starlette.websockets import WebSocket, WebSocketDisconnect
-from datetime import datetime
-from pydantic import BaseModel, field_validator
-
-DATABASE_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) #?
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.exc import DBAPIError, OperationalError, InterfaceError, TimeoutError as SATimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncConnection
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, Response
+import asyncio
+import logging
+import orjson
+from uuid import uuid4
+from starlette.websockets import WebSocket
+from datetime import datetime, timezone
+from pydantic import BaseModel, AwareDatetime, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
+
+DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+if POSTGRES_PGBOUNCER:
+    # pgbouncer owns the pool; prepared statements must not be cached or reuse names across
+    # server connections under transaction pooling
+    engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=NullPool,
+        connect_args={
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        },
+    )
+else:
+    engine = create_async_engine(
+        DATABASE_URL,
+        pool_size=POSTGRES_POOL_SIZE,
+        max_overflow=POSTGRES_MAX_OVERFLOW,
+        pool_timeout=POSTGRES_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=POSTGRES_POOL_RECYCLE,
+    )
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 metadata = MetaData()
 
@@ -30,6 +59,35 @@ processed_agent_data = Table(
     Column("timestamp", DateTime),
 )
 
+# Історія конкретного користувача за часом
+ix_processed_agent_data_user_id_timestamp = Index(
+    "ix_processed_agent_data_user_id_timestamp",
+    processed_agent_data.c.user_id,
+    processed_agent_data.c.timestamp,
+)
+
+# Statements are built once and reused, so SQLAlchemy serves them from its compiled cache
+_INS = processed_agent_data.insert()
+_SEL_BY_ID = select(processed_agent_data).where(processed_agent_data.c.id == bindparam("processed_agent_data_id"))
+# UPDATE/DELETE return the affected row, so no separate SELECT is needed to check existence
+_UPD = (
+    processed_agent_data.update()
+    .where(processed_agent_data.c.id == bindparam("processed_agent_data_id"))
+    .returning(processed_agent_data)
+)
+_DEL = (
+    processed_agent_data.delete()
+    .where(processed_agent_data.c.id == bindparam("processed_agent_data_id"))
+    .returning(processed_agent_data)
+)
+# Keyset pagination: rows after the given id, in id order
+_SEL_PAGE = (
+    select(processed_agent_data)
+    .where(processed_agent_data.c.id > bindparam("after_id"))
+    .order_by(processed_agent_data.c.id)
+    .limit(bindparam("limit"))
+)
+
 
 # SQLAlchemy model
 class AccelerometerData(BaseModel):
@@ -43,22 +101,17 @@ class GpsData(BaseModel):
     longitude: float
 
 
+# Межі колонки user_id (int4)
+INT4_MIN = -2 ** 31
+INT4_MAX = 2 ** 31 - 1
+
+
 class AgentData(BaseModel):
-    user_id: int
+    user_id: int = Field(ge=INT4_MIN, le=INT4_MAX)
     accelerometer: AccelerometerData
     gps: GpsData
-    timestamp: datetime
-
-    @classmethod
-    @field_validator('timestamp', mode='before')
-    def check_timestamp(cls, value):
-        if isinstance(value, datetime):
-            return value
-        try:
-            return datetime.fromisoformat(value)
-        except (TypeError, ValueError):
-            raise ValueError(
-                "Invalid timestamp format. Expected ISO 8601 format (YYYY-MM-DDTHH:MM:SSZ).")
+    # ISO 8601 з часовою зоною (YYYY-MM-DDTHH:MM:SSZ), розбирається в pydantic-core
+    timestamp: AwareDatetime
 
 
 class ProcessedAgentData(BaseModel):
@@ -66,7 +119,60 @@ class ProcessedAgentData(BaseModel):
     agent_data: AgentData
 
 
+# Валідатор для списку записів, зібраний один раз
+processed_agent_data_list_adapter = TypeAdapter(List[ProcessedAgentData])
+# Схема тіла для OpenAPI: ендпоінт читає сирий Request, тож FastAPI її сам не виведе.
+# Посилання ведуть у components/schemas, де моделі вже є завдяки POST /processed_agent_data/
+processed_agent_data_list_schema = processed_agent_data_list_adapter.json_schema(
+    ref_template="#/components/schemas/{model}"
+)
+processed_agent_data_list_schema.pop("$defs", None)
+
+
+# Колонка TIMESTAMP без часової зони, а asyncpg не приймає aware datetime: зберігаємо UTC
+def to_db_timestamp(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def processed_agent_data_row(data: ProcessedAgentData) -> dict:
+    agent_data = data.agent_data
+    return {
+        "road_state": data.road_state,
+        "user_id": agent_data.user_id,
+        "x": agent_data.accelerometer.x,
+        "y": agent_data.accelerometer.y,
+        "z": agent_data.accelerometer.z,
+        "latitude": agent_data.gps.latitude,
+        "longitude": agent_data.gps.longitude,
+        "timestamp": to_db_timestamp(agent_data.timestamp),
+    }
+
+
+def processed_agent_data_message(data: ProcessedAgentData) -> dict:
+    agent_data = data.agent_data
+    return {
+        "road_state": data.road_state,
+        "agent_data": {
+            "user_id": agent_data.user_id,
+            "accelerometer": {
+                "x": agent_data.accelerometer.x,
+                "y": agent_data.accelerometer.y,
+                "z": agent_data.accelerometer.z
+            },
+            "gps": {
+                "latitude": agent_data.gps.latitude,
+                "longitude": agent_data.gps.longitude
+            },
+            "timestamp": agent_data.timestamp.isoformat()
+        }
+    }
+
+
 class ProcessedAgentDataInDB(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     road_state: str
     user_id: int
@@ -75,41 +181,291 @@ class ProcessedAgentDataInDB(BaseModel):
     z: float
     latitude: float
     longitude: float
-    timestamp: datetime
+    # У базі час зберігається як UTC без часової зони, тож позначаємо його як UTC
+    timestamp: AwareDatetime
+
+    @field_validator('timestamp', mode='before')
+    @classmethod
+    def mark_timestamp_utc(cls, value):
+        if isinstance(value, datetime) and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+
+processed_agent_data_in_db_list_adapter = TypeAdapter(List[ProcessedAgentDataInDB])
 
 
-app = FastAPI()
-subscriptions: Set[WebSocket] = set()
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+SUBSCRIBER_QUEUE_SIZE = 128
+BROADCAST_BATCH_SIZE = 50
+
+
+# WebSocket subscriber with its own outbound queue, so a slow client doesn't stall the others
+class Subscriber:
+    def __init__(self, user_id: int, websocket: WebSocket):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.task = asyncio.create_task(self.relay())
+
+    def push(self, payload: bytes):
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # Відкидаємо найстаріше повідомлення
+            self.queue.get_nowait()
+            self.queue.put_nowait(payload)
+
+    async def relay(self):
+        try:
+            while True:
+                await self.websocket.send_bytes(await self.queue.get())
+        except Exception as e:
+            logger.warning("Dropping subscriber of user %s: %r", self.user_id, e)
+            discard_subscriber(self)
+
+    def close(self):
+        self.task.cancel()
+
+
+subscriptions: Dict[int, Set[Subscriber]] = defaultdict(set)
 
 
 # FastAPI WebSocket endpoint
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
     await websocket.accept()
-    if user_id not in subscriptions:
-        subscriptions[user_id] = set()
-    subscriptions[user_id].add(websocket)
+    subscriber = Subscriber(user_id, websocket)
+    subscriptions[user_id].add(subscriber)
     try:
+        # Повідомлення клієнта не читаємо, лише чекаємо на відключення; живучість перевіряють ping-и сервера
         while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        subscriptions[user_id].remove(websocket)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        discard_subscriber(subscriber)
+        subscriber.close()
+
+
+def discard_subscriber(subscriber: Subscriber):
+    subscribers = subscriptions.get(subscriber.user_id)
+    if subscribers is None:
+        return
+    subscribers.discard(subscriber)
+    if not subscribers:
+        del subscriptions[subscriber.user_id]
 
 
 
 # Function to send data to subscribed users
 async def send_data_to_subscribers(user_id: int, data):
+    subscribers = subscriptions.get(user_id)
+    if not subscribers:
+        return
+    # Серіалізуємо один раз, надсилання виконують relay-задачі підписників
+    payload = orjson.dumps(data)
+    if len(subscribers) <= BROADCAST_BATCH_SIZE:
+        for subscriber in subscribers:
+            subscriber.push(payload)
+        return
+    # Для великої кількості підписників віддаємо керування циклу подій між пачками
+    subscribers = list(subscribers)
+    for start in range(0, len(subscribers), BROADCAST_BATCH_SIZE):
+        if start:
+            await asyncio.sleep(0)
+        for subscriber in subscribers[start:start + BROADCAST_BATCH_SIZE]:
+            subscriber.push(payload)
+
+
+# Background batch writer: POST handlers enqueue rows, one task inserts them in bulk
+write_queue: Optional[asyncio.Queue] = None
+batch_writer_task: Optional[asyncio.Task] = None
+in_flight_rows = 0
+stop_pending = False
+_STOP = object()
+
+
+async def insert_rows(rows: List[dict]):
+    async with SessionLocal() as db:
+        await db.execute(_INS, rows)
+        await db.commit()
+
+
+def is_connection_error(e: Exception) -> bool:
+    if isinstance(e, DBAPIError):
+        return e.connection_invalidated or isinstance(e, (OperationalError, InterfaceError))
+    # OSError покриває відмову з'єднання і таймаути підключення; SATimeoutError - вичерпаний пул
+    return isinstance(e, (OSError, SATimeoutError))
+
+
+async def insert_rows_until_connected(rows: List[dict]):
+    # Поки база недоступна, повторюємо з наростаючою затримкою; черга тим часом обмежує прийом
+    delay = WRITE_RETRY_DELAY_MS / 1000
+    attempt = 1
+    while True:
+        try:
+            await insert_rows(rows)
+            return
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            logger.warning("Database unavailable, retrying insert of %d rows in %.1fs (attempt %d): %r",
+                           len(rows), delay, attempt, e)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WRITE_RETRY_MAX_DELAY_MS / 1000)
+        attempt += 1
+
+
+async def flush_rows(rows: List[dict]):
+    # Клієнти вже отримали 202: при помилці даних пишемо по рядку,
+    # щоб через один поганий рядок не втратити решту
+    try:
+        await insert_rows_until_connected(rows)
+        return
+    except Exception as e:
+        logger.warning("Failed to insert %d rows, inserting them one by one: %r", len(rows), e)
+    dropped = 0
+    for row in rows:
+        try:
+            await insert_rows_until_connected([row])
+        except Exception as e:
+            dropped += 1
+            logger.error("Dropping row %r: %r", row, e)
+    if dropped:
+        logger.error("Dropped %d of %d rows", dropped, len(rows))
+
+
+async def batch_writer():
+    global in_flight_rows, stop_pending
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        try:
+            row = await write_queue.get()
+            if row is _STOP:
+                stop_pending = False
+                break
+            rows = [row]
+            deadline = loop.time() + WRITE_FLUSH_INTERVAL_MS / 1000
+            # Збираємо рядки, доки не набереться WRITE_MAX_ROWS або не мине інтервал
+            while len(rows) < WRITE_MAX_ROWS:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stop_pending = False
+                    stopping = True
+                    break
+                rows.append(row)
+            in_flight_rows = len(rows)
+            await flush_rows(rows)
+            in_flight_rows = 0
+        except Exception:
+            # Писач не повинен зупинятися, інакше черга заповниться і POST-и зависнуть
+            in_flight_rows = 0
+            logger.exception("Batch writer iteration failed")
+
+
+# Останній запис кожного користувача; ticker розсилає їх з фіксованою частотою
+latest_data: Dict[int, ProcessedAgentData] = {}
+broadcast_ticker_task: Optional[asyncio.Task] = None
+
+
+def publish_latest(data: ProcessedAgentData):
+    user_id = data.agent_data.user_id
     if user_id in subscriptions:
-        for websocket in subscriptions[user_id]:
-            await websocket.send_json(json.dumps(data))
+        latest_data[user_id] = data
 
 
-def get_db():
-    db = SessionLocal()
+async def broadcast_latest(user_id: int, data: ProcessedAgentData):
+    await send_data_to_subscribers(user_id, processed_agent_data_message(data))
+
+
+async def broadcast_ticker():
+    global latest_data
+    while True:
+        await asyncio.sleep(BROADCAST_INTERVAL_MS / 1000)
+        if not latest_data:
+            continue
+        snapshot, latest_data = latest_data, {}
+        # Помилка для одного користувача не повинна зупиняти розсилку для всіх
+        try:
+            results = await asyncio.gather(*(
+                broadcast_latest(user_id, data) for user_id, data in snapshot.items()
+            ), return_exceptions=True)
+        except Exception:
+            logger.exception("Broadcast tick failed")
+            continue
+        for user_id, result in zip(snapshot, results):
+            if isinstance(result, Exception):
+                logger.error("Failed to broadcast to subscribers of user %s", user_id, exc_info=result)
+
+
+# structure.sql виконується лише на порожній базі, тож індекси, додані пізніше, створюємо тут
+@app.on_event("startup")
+async def create_missing_indexes():
     try:
+        async with engine.begin() as conn:
+            await conn.execute(CreateIndex(ix_processed_agent_data_user_id_timestamp, if_not_exists=True))
+    except Exception:
+        logger.exception("Failed to create missing indexes")
+
+
+@app.on_event("startup")
+async def start_batch_writer():
+    global write_queue, batch_writer_task, stop_pending
+    write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+    stop_pending = False
+    batch_writer_task = asyncio.create_task(batch_writer())
+
+
+@app.on_event("shutdown")
+async def stop_batch_writer():
+    # Записуємо все, що залишилось у черзі, перед зупинкою
+    try:
+        await asyncio.wait_for(drain_write_queue(), WRITE_SHUTDOWN_TIMEOUT_MS / 1000)
+    except asyncio.TimeoutError:
+        # _STOP, якщо писач його ще не забрав, рядком не є
+        queued = write_queue.qsize() - (1 if stop_pending else 0)
+        logger.error("Batch writer didn't finish before shutdown, %d rows lost", in_flight_rows + queued)
+        batch_writer_task.cancel()
+
+
+async def drain_write_queue():
+    global stop_pending
+    await write_queue.put(_STOP)
+    stop_pending = True
+    await batch_writer_task
+
+
+@app.on_event("startup")
+async def start_broadcast_ticker():
+    global broadcast_ticker_task
+    broadcast_ticker_task = asyncio.create_task(broadcast_ticker())
+
+
+@app.on_event("shutdown")
+async def stop_broadcast_ticker():
+    broadcast_ticker_task.cancel()
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+# Read-only endpoints don't need the Session unit of work, a plain connection is enough
+async def get_conn():
+    async with engine.connect() as conn:
+        yield conn
 
 # FastAPI CRUDL endpoints--------------------------------------------------------------------------------------------------
 
@@ -119,10 +475,20 @@ def get_db():
 
 #Get list of data
 @app.get("/processed_agent_data/", response_model=list[ProcessedAgentDataInDB])
-def list_processed_agent_data(db: Session = Depends(get_db)):
+async def list_processed_agent_data(
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = None,
+    conn: AsyncConnection = Depends(get_conn),
+):
     try:
-        processed_agent_data_ = db.query(processed_agent_data).all()
-        return processed_agent_data_
+        params = {"after_id": after_id if after_id is not None else 0, "limit": limit}
+        rows = (await conn.execute(_SEL_PAGE, params)).mappings().all()
+        # Валідація і серіалізація всієї сторінки одним викликом pydantic-core
+        processed_agent_data_ = processed_agent_data_in_db_list_adapter.validate_python(rows)
+        return Response(
+            content=processed_agent_data_in_db_list_adapter.dump_json(processed_agent_data_),
+            media_type="application/json",
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -130,15 +496,16 @@ def list_processed_agent_data(db: Session = Depends(get_db)):
 
 #Get data by Id
 @app.get("/processed_agent_data/{processed_agent_data_id}", response_model=ProcessedAgentDataInDB)
-def read_processed_agent_data(processed_agent_data_id: int, db: Session = Depends(get_db)):
+async def read_processed_agent_data(processed_agent_data_id: int, conn: AsyncConnection = Depends(get_conn)):
     try:
-        query = select(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        result = db.execute(query).first()
+        result = (await conn.execute(_SEL_BY_ID, {"processed_agent_data_id": processed_agent_data_id})).mappings().first()
 
         if result is None:
             raise HTTPException(status_code=404, detail="Data not found")
 
-        return result
+        return ProcessedAgentDataInDB.model_validate(result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -146,44 +513,39 @@ def read_processed_agent_data(processed_agent_data_id: int, db: Session = Depend
 
 
 #Create data
-@app.post("/processed_agent_data/")
-async def create_processed_agent_data(data: ProcessedAgentData, db: Session = Depends(get_db)):
+@app.post("/processed_agent_data/", status_code=202)
+async def create_processed_agent_data(data: ProcessedAgentData):
     try:
-        user_id = data.agent_data.user_id
-        road_state = data.road_state
-        agent_data = data.agent_data
-
-        db.execute(
-            processed_agent_data.insert().values(
-                road_state=road_state,
-                user_id=user_id,
-                x=agent_data.accelerometer.x,
-                y=agent_data.accelerometer.y,
-                z=agent_data.accelerometer.z,
-                latitude=agent_data.gps.latitude,
-                longitude=agent_data.gps.longitude,
-                timestamp=agent_data.timestamp
-            )
-        )
-        db.commit()
-        data_to_send = {
-            "road_state": road_state,
-            "agent_data": {
-                "user_id": user_id,
-                "accelerometer": {
-                    "x": agent_data.accelerometer.x,
-                    "y": agent_data.accelerometer.y,
-                    "z": agent_data.accelerometer.z
-                },
-                "gps": {
-                    "latitude": agent_data.gps.latitude,
-                    "longitude": agent_data.gps.longitude
-                },
-                "timestamp": agent_data.timestamp.isoformat()
-            }
+        await write_queue.put(processed_agent_data_row(data))
+        publish_latest(data)  # Надіслати дані підписникам на наступному такті
+        return {"message": "Data accepted"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+
+#Create list of data
+@app.post(
+    "/processed_agent_data/batch",
+    status_code=202,
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/json": {"schema": processed_agent_data_list_schema}},
+            "required": True,
         }
-        await send_data_to_subscribers(user_id, data_to_send)  # Надіслати дані підписникам
-        return {"message": "Data inserted successfully"}
+    },
+)
+async def create_processed_agent_data_batch(request: Request):
+    try:
+        data = processed_agent_data_list_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+    try:
+        # Рядки записує batch_writer пачками через executemany
+        for item in data:
+            await write_queue.put(processed_agent_data_row(item))
+            publish_latest(item)
+        return {"message": "Data accepted"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -191,47 +553,21 @@ async def create_processed_agent_data(data: ProcessedAgentData, db: Session = De
 
 #Update data
 @app.put("/processed_agent_data/{processed_agent_data_id}", response_model=ProcessedAgentDataInDB)
-def update_processed_agent_data(processed_agent_data_id: int, data: ProcessedAgentData, db: Session = Depends(get_db)):
+async def update_processed_agent_data(processed_agent_data_id: int, data: ProcessedAgentData, db: AsyncSession = Depends(get_db)):
     try:
-        # Отримуємо дані для оновлення за допомогою id
-        query = select(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        existing_data = db.execute(query).first()
+        # Оновлюємо дані й одразу отримуємо оновлений запис
+        updated_data = (await db.execute(_UPD, {"processed_agent_data_id": processed_agent_data_id, **processed_agent_data_row(data)})).mappings().first()
 
-        # Перевіряємо, чи існує запис з вказаним id
-        if existing_data is None:
+        # Перевіряємо, чи існував запис з вказаним id
+        if updated_data is None:
             raise HTTPException(status_code=404, detail="Data not found")
 
-        # Оновлюємо дані
-        agent_data = data.agent_data
-        db.execute(
-            processed_agent_data.update()
-            .where(processed_agent_data.c.id == processed_agent_data_id)
-            .values(
-                road_state=data.road_state,
-                user_id=agent_data.user_id,
-                x=agent_data.accelerometer.x,
-                y=agent_data.accelerometer.y,
-                z=agent_data.accelerometer.z,
-                latitude=agent_data.gps.latitude,
-                longitude=agent_data.gps.longitude,
-                timestamp=agent_data.timestamp
-            )
-        )
-        db.commit()
+        await db.commit()
 
         # Повертаємо оновлені дані
-        updated_data = ProcessedAgentDataInDB(
-            id=processed_agent_data_id,
-            road_state=data.road_state,
-            user_id=agent_data.user_id,
-            x=agent_data.accelerometer.x,
-            y=agent_data.accelerometer.y,
-            z=agent_data.accelerometer.z,
-            latitude=agent_data.gps.latitude,
-            longitude=agent_data.gps.longitude,
-            timestamp=agent_data.timestamp
-        )
-        return updated_data
+        return ProcessedAgentDataInDB.model_validate(updated_data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -239,26 +575,26 @@ def update_processed_agent_data(processed_agent_data_id: int, data: ProcessedAge
 
 #Delete data
 @app.delete("/processed_agent_data/{processed_agent_data_id}", response_model=ProcessedAgentDataInDB)
-def delete_processed_agent_data(processed_agent_data_id: int, db: Session = Depends(get_db)):
+async def delete_processed_agent_data(processed_agent_data_id: int, db: AsyncSession = Depends(get_db)):
     try:
-        # Отримуємо дані, які потрібно видалити за допомогою id
-        query = select(processed_agent_data).where(processed_agent_data.c.id == processed_agent_data_id)
-        existing_data = db.execute(query).first()
+        # Видаляємо дані й одразу отримуємо видалений запис
+        existing_data = (await db.execute(_DEL, {"processed_agent_data_id": processed_agent_data_id})).mappings().first()
 
-        # Перевіряємо, чи існує запис з вказаним id
+        # Перевіряємо, чи існував запис з вказаним id
         if existing_data is None:
             raise HTTPException(status_code=404, detail="Data not found")
 
-        # Видаляємо дані
-        db.execute(processed_agent_data.delete().where(processed_agent_data.c.id == processed_agent_data_id))
-        db.commit()
+        await db.commit()
 
         # Повертаємо видалені дані
-        return existing_data
+        return ProcessedAgentDataInDB.model_validate(existing_data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    uvicorn.run(app, host="127.0.0.1", port=8000, loop="auto", ws="websockets", ws_per_message_deflate=False,
+                ws_ping_interval=20, ws_ping_timeout=20)